@@ -1,9 +1,14 @@
+import bisect
 import curses
 import datetime
+import functools
 import locale
 import logging
+import sys
+import time
 
-from random import randrange, seed
+from itertools import product
+from random import choices, randrange, seed
 from enum import Enum
 
 seed()
@@ -23,9 +28,39 @@ log.info("Logger initialised")
 
 timewidth = 5
 slotwidth = 5
+tablewidth = timewidth + 7 * (slotwidth + 1) + 1  # time labels, 7 days of timeslots and their borders
+frametime = 1 / 60  # seconds of queued input the input loop processes before flushing the screen
+slot_blank = " " * slotwidth
+slot_full = "█" * slotwidth  # planned activity was verified
+slot_dim = "░" * slotwidth  # verified activity differs from the plan
+
+
+@functools.lru_cache(maxsize=8)
+def time_labels(nr_timesegments):
+    """Returns the HH:MM start time label of every timesegment in a day"""
+    minutes = (i * 24 * 60 // nr_timesegments for i in range(nr_timesegments))
+    return tuple(f"{m // 60:02d}:{m % 60:02d}" for m in minutes)
+
+
+# Terminals buffer a frame between these DEC private mode sequences and present it at once, unsupporting terminals ignore
+# them, but a Windows console without VT processing prints them as text
+synchronized_output = sys.platform != "win32"
+
+
+def update_screen():
+    """Flushes all pending pad refreshes to the terminal, as one synchronized update where supported"""
+    if not synchronized_output:
+        curses.doupdate()
+        return
+    curses.putp(b"\033[?2026h")  # queued in the curses output buffer, written ahead of the update
+    curses.doupdate()
+    sys.stdout.write("\033[?2026l")
+    sys.stdout.flush()
 
 
 class Input:
+    loops_started = 0  # lets an input loop tell that a control ran a nested loop, which sets its own read timeout
+
     def __init__(self):
         self.controls = {}
         self.controller = None
@@ -40,39 +75,59 @@ class Input:
 
     def install(self, controller, fallback: tuple = (), screen=None):
         self.controller = controller
-        self.fallback = fallback
+        for e in fallback:
+            if getattr(e, "input", None) is None:
+                log.warning("Could not install %s as input fallback because it does not have an Input.", e.__class__.__name__)
+        self.fallback = tuple(e for e in fallback if getattr(e, "input", None) is not None)
         self.screen = screen
 
     def process(self, c):
+        """Dispatches an input to its control or the fallbacks, returns whether any control handled it"""
         if self.controller is None:
-            log.warning(f"Could not process input '{c}' for {self} because it does not have a controller installed.")
-            return
+            log.warning("Could not process input '%s' for %s because it does not have a controller installed.", c, self)
+            return False
         self.c = c
-        if c not in self.controls:
-            if "*" in self.controls:
-                self.controls["*"](self.controller)
-                return
-            for e in self.fallback:
-                try:
-                    e.input
-                except AttributeError:
-                    log.warning(f"Could not process input '{c}' for {e.__class__.__name__} because it does not have an Input.")
-                    continue
-                e.input.process(c)
-
-            return
-        self.controls[c](self.controller)
+        control = self.controls.get(c) or self.controls.get("*")
+        if control is not None:
+            control(self.controller)
+            return True
+        handled = False
+        for e in self.fallback:
+            handled = e.input.process(c) or handled
+        return handled
 
     class InputBreak(Exception):
         pass
 
     def start_loop(self):
         if self.screen is None:
-            log.warning(f"Could not start input loop for {self} because it does not have a screen installed.")
+            log.warning("Could not start input loop for %s because it does not have a screen installed.", self)
             return
+        Input.loops_started += 1
         try:
+            # Pads only mark themselves for refresh, flush them all to the terminal at once
+            update_screen()
             while True:
-                self.process(self.screen.getch())
+                # The screen is shared with nested loops, so every read sets the timeout it needs itself
+                self.screen.timeout(-1)  # block while idle, the loop has no periodic work
+                c = self.screen.getch()
+                if c == curses.ERR:
+                    continue  # interrupted without input
+                handled = self.process(c)
+                # Process the inputs that queued up in the meantime (e.g. a held key) before flushing the screen once,
+                # but flush at least once a frame while input keeps arriving
+                deadline = time.monotonic() + frametime
+                self.screen.timeout(0)
+                while time.monotonic() < deadline:
+                    c = self.screen.getch()
+                    if c == curses.ERR:
+                        break
+                    loops_started = Input.loops_started
+                    handled = self.process(c) or handled
+                    if Input.loops_started != loops_started:
+                        self.screen.timeout(0)
+                if handled:
+                    update_screen()  # unhandled inputs change nothing, so there is nothing to flush
         except self.InputBreak:
             return
 
@@ -92,7 +147,11 @@ class Input:
         for c in self.c:
             if c in self.controls.keys():
                 log.warning(
-                    f"Key '{c}' in '{self}' is already bound to function '{self.controls[c]}'. This will be overwritten with function '{func}'."
+                    "Key '%s' in '%s' is already bound to function '%s'. This will be overwritten with function '%s'.",
+                    c,
+                    self,
+                    self.controls[c],
+                    func,
                 )
             self.controls[c] = func
         return func
@@ -147,7 +206,12 @@ class Pad:
         self.clipwidth = self.brx - self.ulx + 1
         if self.clipheight <= 0 or self.clipwidth <= 0:
             log.warning(
-                f"Cannot draw {self.__class__.__name__} with frame-relative upper left corner ({self.uly, self.ulx}) and frame-relative bottom right corner ({self.bry, self.brx}) because clip width or height is zero or negative.  "
+                "Cannot draw %s with frame-relative upper left corner (%d, %d) and frame-relative bottom right corner (%d, %d) because clip width or height is zero or negative.",
+                self.__class__.__name__,
+                self.uly,
+                self.ulx,
+                self.bry,
+                self.brx,
             )
             self.refreshable = False
             return
@@ -169,7 +233,7 @@ class Pad:
             self.width = self.clipwidth
 
         if self.height <= 0 or self.width <= 0:
-            log.warning(f"{self.__class__.__name__} has invalid pad height '{self.height}' and/or width '{self.width}'.")
+            log.warning("%s has invalid pad height '%d' and/or width '%d'.", self.__class__.__name__, self.height, self.width)
             self.refreshable = False
             return
 
@@ -180,7 +244,12 @@ class Pad:
         if (not self.init_pad) or ((self.pad is not None) and (self.pad.getmaxyx() == (self.height + 1, self.width))):
             return
 
-        self.pad = curses.newpad(self.height + 1, self.width)
+        if self.pad is None:
+            self.pad = curses.newpad(self.height + 1, self.width)
+        else:
+            # Reuse the existing cell buffer instead of allocating a new pad
+            self.pad.resize(self.height + 1, self.width)
+            self.pad.erase()
 
         # (Re)draw static content of the pad
         self.draw_static()
@@ -228,9 +297,9 @@ class Pad:
     def draw_static(self):
         pass
 
-    def refresh(self):
+    def noutrefresh(self):
         if self.refreshable:
-            self.pad.refresh(
+            self.pad.noutrefresh(
                 self.justy,
                 self.justx,
                 self.absuly,
@@ -287,7 +356,7 @@ class Frame(Pad):
         elif isinstance(pad, Pad):
             Pad.__init__(pad, parent=self)
         else:
-            log.error(f"Could not spawn {pad} because it is not a valid Frame or Pad.")
+            log.error("Could not spawn %s because it is not a valid Frame or Pad.", pad)
             return
         self.pads.append(pad)
         if not self.spawning:
@@ -389,27 +458,25 @@ class Frame(Pad):
     def draw_static(self):
         if not self.bordered:
             return
-        # # is a placeholder corner character
+        # top/bottom side
+        self.pad.hline(0, 1, curses.ACS_HLINE, self.width - 2)
+        self.pad.hline(self.height - 1, 1, curses.ACS_HLINE, self.width - 2)
+        # left/right side
+        self.pad.vline(1, 0, curses.ACS_VLINE, self.height - 2)
+        self.pad.vline(1, self.width - 1, curses.ACS_VLINE, self.height - 2)
+        # # is a placeholder corner character, painted last so it overwrites the sides
         self.pad.addch(0, 0, 35)  # paint # in
         self.pad.addch(0, self.width - 1, 35)  # #
         self.pad.addch(self.height - 1, 0, 35)  # #
         self.pad.addch(self.height - 1, self.width - 1, 35)  # #
-        # left/right side
-        for y in range(1, self.height - 1):
-            self.pad.addch(y, 0, "│")
-            self.pad.addch(y, self.width - 1, "│")
-        # top/bottom side
-        for x in range(1, self.width - 1):
-            self.pad.addch(0, x, "─")
-            self.pad.addch(self.height - 1, x, "─")
 
-    def refresh(self):
+    def noutrefresh(self):
         if not self.refreshable:
             return
         if self.bordered:
-            Pad.refresh(self)
+            Pad.noutrefresh(self)
         for child in self.pads:
-            child.refresh()
+            child.noutrefresh()
 
 
 class RootFrame(Frame):
@@ -424,12 +491,14 @@ class RootFrame(Frame):
     @input.on_key(curses.KEY_RESIZE)
     def resize_term(self):
         termheight, termwidth = self.screen.getmaxyx()
+        if (self.bry, self.brx) == (termheight - 1, termwidth - 1):
+            return
         curses.resize_term(termheight, termwidth)
-        self.screen.refresh()  # clear the screen
+        self.screen.noutrefresh()  # clear the screen
         self.uly, self.ulx = 0, 0
         self.bry, self.brx = termheight - 1, termwidth - 1
         self.resize()
-        self.refresh()
+        self.noutrefresh()
 
 
 class TwoEight(RootFrame):
@@ -475,6 +544,8 @@ class WeekTab(Frame):
 
     input = Input()
 
+    shift_keys = frozenset(map(ord, "WASD"))  # cursor moves that extend the selection
+
     def __init__(self, weekdata):
         self.weekdata = weekdata
 
@@ -505,24 +576,30 @@ class WeekTab(Frame):
         self.timetable_select(0, 1)
 
     def timetable_select(self, d_y, d_x):
-        self.activitytable.draw_activities_markers(*self.timetable.cursor_timeslot(), clear=True)
+        prev_y, prev_x = self.timetable.cursor_timeslot()
         self.timetable.cursor_y += d_y
         self.timetable.cursor_x += d_x
-        self.timetable.select(shift=chr(self.input.c).isupper())
-        self.activitytable.draw_activities_markers(*self.timetable.cursor_timeslot())
-        self.activitytable.refresh()
+        self.timetable.select(shift=self.input.c in self.shift_keys)
+        y, x = self.timetable.cursor_timeslot()
+        prev_timeslot, timeslot = self.weekdata.timetable[prev_y][prev_x], self.weekdata.timetable[y][x]
+        if (prev_timeslot.plan, prev_timeslot.verify) == (timeslot.plan, timeslot.verify):
+            return  # the activity markers stay the same, leave the activity table untouched
+        self.activitytable.draw_activities_markers(prev_y, prev_x, clear=True)
+        self.activitytable.draw_activities_markers(y, x)
+        self.activitytable.noutrefresh()
 
     @input.on_key(ord("q"), ord("e"))
     def assign(self):
         verify = self.input.c == ord("e")
         activity = self.activitytable.cursor_activity()
         self.activitytable.draw_activities_markers(*self.timetable.cursor_timeslot(), clear=True)
-        for y, x in self.timetable.selected:
-            self.weekdata.assign(y, x, activity, verify=verify)
-            self.timetable.draw_timeslot(y, x)
-        self.timetable.refresh()
+        assign, draw_timeslot = self.weekdata.assign, self.timetable.draw_timeslot
+        for y, x in self.timetable.selected_timeslots():
+            assign(y, x, activity, verify=verify)
+            draw_timeslot(y, x)
+        self.timetable.noutrefresh()
         self.activitytable.draw_activities_markers(*self.timetable.cursor_timeslot())
-        self.activitytable.refresh()
+        self.activitytable.noutrefresh()
 
     @input.on_key(ord("i"))
     def activitytable_up(self):
@@ -543,9 +620,9 @@ class WeekTab(Frame):
                 if x.verify == activity:
                     x.verify = None
                     self.timetable.draw_timeslot(i, j)
-        self.timetable.refresh()
+        self.timetable.noutrefresh()
         self.activitytable.delete()
-        self.activitytable.refresh()
+        self.activitytable.noutrefresh()
 
     @input.on_key(ord("o"))
     def activitytable_edit(self):
@@ -556,9 +633,9 @@ class VertScrollPad(Pad):
     scroll_variable = 0
     scrollpos = 0
 
-    def refresh(self):
+    def noutrefresh(self):
         if self.refreshable:
-            self.pad.refresh(
+            self.pad.noutrefresh(
                 self.justy + self.scrollpos,
                 self.justx,
                 self.absuly,
@@ -572,6 +649,8 @@ class VertScrollPad(Pad):
         self.scroll(self.scroll_variable)
 
     def scroll(self, select):
+        """Scrolls the pad to keep the select row in view, returns whether the scroll position changed"""
+        scrollpos = self.scrollpos
         self.scroll_variable = select
         prescroll = self.clipheight // 4
         select_scroll_delta_lower = select - prescroll
@@ -581,96 +660,132 @@ class VertScrollPad(Pad):
         elif select_scroll_delta_lower < self.scrollpos:
             self.scrollpos = select_scroll_delta_lower
         self.scrollpos = max(0, min(self.height - self.clipheight, self.scrollpos))
+        return self.scrollpos != scrollpos
 
 
 class TimetablePad(VertScrollPad):
-    width = 48
+    width = tablewidth
 
     def __init__(self, weekdata):
         self.weekdata = weekdata
         self.height = weekdata.nr_timesegments
         self.cursor_y, self.cursor_x = 0, 0
         self.hold_cursor_y, self.hold_cursor_x = self.cursor_y, self.cursor_x
-        self.selected = ((self.cursor_y, self.cursor_x),)
+        self.select_uly, self.select_bry = self.cursor_y, self.cursor_y
+        self.select_ulx, self.select_brx = self.cursor_x, self.cursor_x
+        self.prev_cursor_y, self.prev_cursor_x = self.cursor_y, self.cursor_x
 
     def draw_static(self):
-        for i in range(0, self.height):
-            minutes = int(i * (24 / self.height) * 60)
-            self.pad.addstr(i, 0, f"{minutes // 60:02d}:{minutes % 60:02d}", curses.A_DIM)
+        for i, label in enumerate(time_labels(self.height)):
+            self.pad.addstr(i, 0, label, curses.A_DIM)
         self.draw_selected()
+        # (plan, verify) last painted per timeslot, the pad was just (re)created so nothing is painted yet
+        self.drawn_timeslots = [[None] * 7 for _ in range(len(self.weekdata.timetable))]
+        draw_timeslot = self.draw_timeslot
         for y in range(len(self.weekdata.timetable)):
-            for x in range(len(self.weekdata.timetable[0])):
-                self.draw_timeslot(y, x)
+            for x in range(7):
+                draw_timeslot(y, x)
 
     def draw_timeslot(self, y, x):
         """Draw a timeslot by its y/x index"""
         timeslot = self.weekdata.timetable[y][x]
+        drawn = (timeslot.plan, timeslot.verify)
+        if self.drawn_timeslots[y][x] == drawn:
+            return
+        self.drawn_timeslots[y][x] = drawn
+        addstr = self.pad.addstr
+        plan, verify = drawn
         begin_x = timewidth + (slotwidth + 1) * x + 1
-        for x_paint in range(begin_x, begin_x + slotwidth):
-            self.pad.addch(y, x_paint, " ")
-        if timeslot.plan == timeslot.verify:
-            char = "█"
+        slot = slot_full if plan == verify else slot_dim
+        if verify is not None:
+            addstr(y, begin_x, slot, verify.attr)
         else:
-            char = "░"
-        if timeslot.verify is not None:
-            for x_paint in range(begin_x, begin_x + slotwidth):
-                self.pad.addch(y, x_paint, char, timeslot.verify.color())
-        if timeslot.plan is not None:
-            self.pad.addch(y, begin_x + slotwidth // 2, char, timeslot.plan.color())
-
-    def draw_selected(self, clear=False):
-        select_char = "+" if not clear else " "
-        for y, x in self.selected:
-            self.pad.addch(y, timewidth + x * 6, select_char)
-            self.pad.addch(y, timewidth + x * 6 + slotwidth + 1, select_char)
-        self.pad.addch(self.cursor_y, timewidth + self.cursor_x * 6, ">")
-        self.pad.addch(self.cursor_y, timewidth + self.cursor_x * 6 + slotwidth + 1, "<")
+            addstr(y, begin_x, slot_blank)
+        if plan is not None:
+            addstr(y, begin_x + slotwidth // 2, slot[0], plan.attr)
+
+    def draw_selected(self):
+        draw_marker = self.draw_marker
+        for y, x in product(range(self.select_uly, self.select_bry + 1), range(self.select_ulx, self.select_brx + 2)):
+            draw_marker(y, x, "+")
+        self.draw_cursor()
+
+    def draw_marker(self, y, x, char):
+        """Draw a selection marker on the left border of the timeslot with y/x index"""
+        self.pad.addch(y, timewidth + x * (slotwidth + 1), char)
+
+    def draw_cursor(self):
+        self.draw_marker(self.cursor_y, self.cursor_x, ">")
+        self.draw_marker(self.cursor_y, self.cursor_x + 1, "<")
 
     def select(self, shift=False):
         self.cursor_y %= self.height
         self.cursor_x %= 7
-        self.scroll(self.cursor_y)
-        self.draw_selected(clear=True)
+        scrolled = self.scroll(self.cursor_y)
         if not shift:
             self.hold_cursor_y, self.hold_cursor_x = self.cursor_y, self.cursor_x
-            self.selected = ((self.cursor_y, self.cursor_x),)
-        else:
-            self.selected = tuple(
-                (y, x)
-                for y in range(
-                    min(self.cursor_y, self.hold_cursor_y),
-                    max(self.cursor_y, self.hold_cursor_y) + 1,
-                )
-                for x in range(
-                    min(self.cursor_x, self.hold_cursor_x),
-                    max(self.cursor_x, self.hold_cursor_x) + 1,
-                )
-            )
+        prev_select = (self.select_uly, self.select_bry, self.select_ulx, self.select_brx)
+        self.select_uly, self.select_bry = sorted((self.cursor_y, self.hold_cursor_y))
+        self.select_ulx, self.select_brx = sorted((self.cursor_x, self.hold_cursor_x))
+        select = (self.select_uly, self.select_bry, self.select_ulx, self.select_brx)
+        prev_cursor = (self.prev_cursor_y, self.prev_cursor_x)
+        self.prev_cursor_y, self.prev_cursor_x = self.cursor_y, self.cursor_x
+
+        if select == prev_select and prev_cursor == (self.cursor_y, self.cursor_x):
+            if scrolled:
+                self.noutrefresh()
+            return
 
-        self.draw_selected()
-        self.refresh()
+        def in_select(y, x, uly, bry, ulx, brx):
+            # A marker column x borders the timeslots x - 1 and x
+            return uly <= y <= bry and ulx <= x <= brx + 1
+
+        # Only repaint the markers that differ between the previous and the current selection
+        draw_marker = self.draw_marker
+        for y, x in product(range(prev_select[0], prev_select[1] + 1), range(prev_select[2], prev_select[3] + 2)):
+            if not in_select(y, x, *select):
+                draw_marker(y, x, " ")
+        for y, x in product(range(select[0], select[1] + 1), range(select[2], select[3] + 2)):
+            if not in_select(y, x, *prev_select):
+                draw_marker(y, x, "+")
+        for x in (prev_cursor[1], prev_cursor[1] + 1):
+            draw_marker(prev_cursor[0], x, "+" if in_select(prev_cursor[0], x, *select) else " ")
+        self.draw_cursor()
+        self.noutrefresh()
 
     def cursor_timeslot(self):
         return self.cursor_y, self.cursor_x
 
+    def selected_timeslots(self):
+        """Returns an iterator over the y/x index of every timeslot in the selection rectangle"""
+        return product(range(self.select_uly, self.select_bry + 1), range(self.select_ulx, self.select_brx + 1))
+
 
 class TimetableHeaderPad(Pad):
     height = 3
-    width = 48
+    width = tablewidth
 
     def __init__(self, weekdata):
         self.weekdata = weekdata
+        self.header_date = None
 
     def draw_static(self):
-        weekdate = self.weekdata.date - datetime.timedelta(days=self.weekdata.date.weekday())
-        month = weekdate.strftime("%b")
-        self.pad.addstr(0, 5 - len(month), month)
-        year = weekdate.strftime("%Y")
-        self.pad.addstr(1, 5 - len(year), year)
-        for i in range(7, self.width, 6):
-            self.pad.addstr(0, i, weekdate.strftime("%d"))
-            self.pad.addstr(1, i, weekdate.strftime("%a"))
-            weekdate += datetime.timedelta(days=1)
+        if self.header_date != self.weekdata.date:
+            self.header_date = self.weekdata.date
+            self.header_rows = self.format_header()
+        for y, row in enumerate(self.header_rows):
+            self.pad.addstr(y, 0, row)
+
+    def format_header(self):
+        """Formats the month/day and year/weekday rows of the header, one string per row"""
+        weekdate = self.weekdata.date
+        weekdates = [weekdate + datetime.timedelta(days=i) for i in range(7)]
+        days = "".join(date.strftime("%d").ljust(6) for date in weekdates)
+        weekdays = "".join(date.strftime("%a").ljust(6) for date in weekdates)
+        return (
+            (weekdate.strftime("%b").rjust(5) + "  " + days).rstrip()[: self.width],
+            (weekdate.strftime("%Y").rjust(5) + "  " + weekdays).rstrip()[: self.width],
+        )
 
 
 class TimetableFrame(Frame):
@@ -702,7 +817,8 @@ class ActivityTablePad(VertScrollPad):
 
     def copy_activities(self):
         self.activities_names = [e.name for e in self.weekdata.activities]
-        self.activities_colors = [e.color() for e in self.weekdata.activities]
+        self.activities_attrs = [e.attr_reverse for e in self.weekdata.activities]
+        self.activities_rows = {e: i for i, e in enumerate(self.weekdata.activities)}
 
     def draw_static(self):
         self.namewidth = self.width - 12
@@ -713,25 +829,26 @@ class ActivityTablePad(VertScrollPad):
         self.pad.move(i, 11)
         self.pad.clrtoeol()
         if self.namewidth > 0:
-            self.pad.addstr(i, 11, self.activities_names[i][: self.namewidth])
-        self.pad.chgat(i, 0, self.activities_colors[i] + curses.A_REVERSE)
+            self.pad.addnstr(i, 11, self.activities_names[i], self.namewidth)
+        self.pad.chgat(i, 0, self.activities_attrs[i])
 
     def draw_activities(self):
         if self.height != len(self.activities_names) + 1:
             self.height = len(self.activities_names) + 1
-            self.resize()
+            self.resize()  # resizing erases the pad and redraws it through draw_static, activities included
+            return
+        draw_activity = self.draw_activity
         for i in range(len(self.activities_names)):
-            self.draw_activity(i)
+            draw_activity(i)
         self.pad.addstr(len(self.activities_names), 11, self.new_str)
 
     def draw_activities_markers(self, y, x, clear=False):
         cursor_timeslot = self.weekdata.timetable[y][x]
         char = "x" if not clear else " "
-        for i in range(len(self.activities_names)):
-            if self.weekdata.activities[i] == cursor_timeslot.plan:
-                self.pad.addch(i, 2, char, self.activities_colors[i] + curses.A_REVERSE)
-            if self.weekdata.activities[i] == cursor_timeslot.verify:
-                self.pad.addch(i, 5, char, self.activities_colors[i] + curses.A_REVERSE)
+        for column, activity in ((2, cursor_timeslot.plan), (5, cursor_timeslot.verify)):
+            i = self.activities_rows.get(activity)
+            if i is not None:
+                self.pad.addch(i, column, char, self.activities_attrs[i])
 
     def draw_cursor(self, clear=False):
         char = ">" if not clear else " "
@@ -740,7 +857,7 @@ class ActivityTablePad(VertScrollPad):
                 self.cursor,
                 8,
                 char,
-                self.activities_colors[self.cursor] + curses.A_REVERSE,
+                self.activities_attrs[self.cursor],
             )
         elif self.cursor == len(self.activities_names):
             self.pad.addch(self.cursor, 8, char)
@@ -751,14 +868,14 @@ class ActivityTablePad(VertScrollPad):
         self.cursor %= self.height
         self.scroll(self.cursor)
         self.draw_cursor()
-        self.refresh()
+        self.noutrefresh()
 
     def delete(self):
         if self.cursor == len(self.activities_names):
             return
         self.pad.move(len(self.activities_names), 0)
         self.pad.clrtoeol()
-        self.refresh()
+        self.noutrefresh()
         self.weekdata.delete_activity(self.cursor_activity())
         self.copy_activities()
         self.draw_activities()
@@ -769,7 +886,7 @@ class ActivityTablePad(VertScrollPad):
         if is_new:
             activity = Activity("", 0, 0, 0) if is_new else self.cursor_activity()
             self.activities_names.append(activity.name)
-            self.activities_colors.append(activity.color())
+            self.activities_attrs.append(activity.attr_reverse)
         else:
             activity = self.cursor_activity()
         activity_name = self.prompt_name(activity)
@@ -778,8 +895,9 @@ class ActivityTablePad(VertScrollPad):
             self.draw_cursor(clear=True)
             if is_new:
                 self.weekdata.add_activity(activity)
-            self.weekdata.edit_activity(activity, activity_name, r, g, b)
-            self.cursor = self.weekdata.activities.index(activity)
+            self.cursor = self.weekdata.edit_activity(activity, activity_name, r, g, b)
+        elif is_new:
+            activity.release_color()  # the new activity was discarded without a name
         self.copy_activities()
         self.draw_activities()
         self.select(0)
@@ -787,7 +905,7 @@ class ActivityTablePad(VertScrollPad):
     def prompt_name(self, activity):
         self.activities_names[self.cursor] = activity.name
         self.draw_activity(self.cursor)
-        self.refresh()
+        self.noutrefresh()
         with self.root().input as seizedinput:
 
             @seizedinput.on_key(curses.KEY_ENTER, 10, 13)  # new line, carriage return
@@ -802,16 +920,16 @@ class ActivityTablePad(VertScrollPad):
                         self.cursor,
                         11 + len(self.activities_names[self.cursor]),
                         " ",
-                        self.activities_colors[self.cursor],
+                        self.activities_attrs[self.cursor],
                     )
                 self.draw_activity(self.cursor)
-                self.refresh()
+                self.noutrefresh()
 
             @seizedinput.on_any()
             def type_char(_):
                 self.activities_names[self.cursor] += chr(seizedinput.c)
                 self.draw_activity(self.cursor)
-                self.refresh()
+                self.noutrefresh()
 
             seizedinput.start_loop()
         return self.activities_names[self.cursor]
@@ -827,7 +945,7 @@ class ActivityTablePad(VertScrollPad):
         self.digit_index = 0
         self.activities_names[self.cursor] = f"R {colors_str[0]} | G {colors_str[1]} | B {colors_str[2]}"
         self.draw_activity(self.cursor)
-        self.refresh()
+        self.noutrefresh()
 
         with self.root().input as seizedinput:
 
@@ -847,13 +965,13 @@ class ActivityTablePad(VertScrollPad):
                 self.digit_index %= 3
                 r, g, b = map(int, colors_str)
                 activity.change_color(r, g, b)
-                self.activities_colors[self.cursor] = activity.color()
+                self.activities_attrs[self.cursor] = activity.attr_reverse
                 self.activities_names[self.cursor] = f"R {colors_str[0]} | G {colors_str[1]} | B {colors_str[2]}"
                 self.draw_activity(self.cursor)
-                self.refresh()
+                self.noutrefresh()
 
             seizedinput.start_loop()
-        return r, g, b
+        return activity.r, activity.g, activity.b  # change_color keeps the edited rgb on the activity
 
     def cursor_activity(self):
         if self.cursor < len(self.activities_names):
@@ -883,8 +1001,8 @@ class ActivityFrame(Frame):
 
 
 class Activity:
-    color_counter = 16
-    color_pair_counter = 16
+    color_counter = 16  # next never used color number, also used as the number of its color pair
+    free_colors = []  # color numbers released by discarded activities
 
     def __init__(self, name: str, r, g, b, desc=""):
         self.name = name
@@ -893,19 +1011,39 @@ class Activity:
         self.b = b
         self.desc = desc
 
-        curses.init_color(Activity.color_counter, r, g, b)
-        self.primary_color = Activity.color_counter
-        curses.init_pair(Activity.color_counter, self.primary_color, 0)
-        self.color_pair = Activity.color_pair_counter
+        # Every activity owns its color and color pair, so recoloring it never has to repaint its cells
+        self.primary_color = Activity.allocate_color()
+        if self.primary_color is None:
+            self.color_pair = 0
+        else:
+            curses.init_color(self.primary_color, r, g, b)
+            curses.init_pair(self.primary_color, self.primary_color, 0)
+            self.color_pair = self.primary_color
+        # The pair never changes after this, which keeps the cached attributes (and the cells painted with them) valid
+        self.attr = curses.color_pair(self.color_pair)
+        self.attr_reverse = self.attr | curses.A_REVERSE
 
-        Activity.color_counter = Activity.color_counter + 1 if Activity.color_counter != curses.COLORS - 1 else 16
-        Activity.color_pair_counter = Activity.color_pair_counter + 1 if Activity.color_pair_counter != curses.COLOR_PAIRS - 1 else 1
+    @classmethod
+    def allocate_color(cls):
+        """Returns a free color number, reusing released ones first, or None once the terminal runs out"""
+        if cls.free_colors:
+            return cls.free_colors.pop()
+        if cls.color_counter >= min(curses.COLORS, curses.COLOR_PAIRS):
+            log.warning("Ran out of terminal colors, new activities fall back to the default color pair")
+            return None
+        cls.color_counter += 1
+        return cls.color_counter - 1
 
-    def change_color(self, r, g, b):
-        curses.init_color(self.primary_color, r, g, b)
+    def release_color(self):
+        """Hands the color of a discarded activity back for reuse by new activities"""
+        if self.primary_color is not None:
+            Activity.free_colors.append(self.primary_color)
+            self.primary_color = None
 
-    def color(self):
-        return curses.color_pair(self.color_pair)
+    def change_color(self, r, g, b):
+        self.r, self.g, self.b = r, g, b
+        if self.primary_color is not None:
+            curses.init_color(self.primary_color, r, g, b)
 
     @classmethod
     def dummy(cls, name):
@@ -922,21 +1060,6 @@ class Timeslot:
         self.plan = plan
         self.verify = verify
 
-    @classmethod
-    def from_strings(cls, plan: str, verify: str, activities: dict):
-        """Given an activity dictionary, creates a Timeslot object from strings. Used by the parser."""
-        try:
-            plan = activities[plan]
-        except KeyError:
-            log.error(f"Could not find an activity with name '{plan}' referenced in timeslot's planned activity.")
-        if verify == "-":
-            return cls(plan, None)
-        try:
-            verify = activities[verify]
-        except KeyError:
-            log.error(f"Could not find an activity with name '{verify}' referenced in timeslot's verify activity.")
-        return cls(plan, verify)
-
 
 class WeekData:
     """Backend for week_pad class"""
@@ -954,25 +1077,30 @@ class WeekData:
         self.activities = sorted(activities, key=lambda x: x.name)
         self.timetable = timetable
 
-        self.date = date
+        # date is always the monday of the week
         if date is None:
             self.date = datetime.date.fromisocalendar(year, week, 1)
             self.year, self.week = year, week
         else:
-            self.date = date
-            self.year, self.week, _ = date.isocalendar()
+            self.year, self.week, weekday = date.isocalendar()
+            self.date = date - datetime.timedelta(days=weekday - 1)
 
-    def add_activity(self, activity: Activity):
-        self.activities.append(activity)
-        self.activities = sorted(self.activities, key=lambda x: x.name)
+    def add_activity(self, activity: Activity) -> int:
+        "Inserts an activity in the name-sorted activity list, returning its index."
+        index = bisect.bisect_right(self.activities, activity.name, key=lambda x: x.name)
+        self.activities.insert(index, activity)
+        return index
 
     def delete_activity(self, activity: Activity):
         self.activities.remove(activity)
+        activity.release_color()
 
-    def edit_activity(self, activity, name, r, g, b):
+    def edit_activity(self, activity, name, r, g, b) -> int:
+        "Edits an activity and moves it to its sorted position, returning its new index."
+        self.activities.remove(activity)
         activity.name = name
-        activity.r, activity.g, activity.b = r, g, b
-        self.activities = sorted(self.activities, key=lambda x: x.name)
+        activity.change_color(r, g, b)
+        return self.add_activity(activity)
 
     def assign(self, y, x, activity, verify=False):
         "Assigns an activity to the timeslot with coordinates y, x."
@@ -995,19 +1123,11 @@ class WeekData:
     def dummy(cls, nr_timesegments, nr_activities=10):
         """Returns a week_data object with placeholder dummy data"""
         activities = [Activity.dummy("dummy" + str(i)) for i in range(nr_activities)]
+        picks = choices(activities, k=nr_timesegments * 7 * 2)  # a plan and a verify activity per timeslot
         return cls(
             nr_timesegments,
             activities,
-            [
-                [
-                    Timeslot(
-                        activities[randrange(0, nr_activities)],
-                        activities[randrange(0, nr_activities)],
-                    )
-                    for j in range(7)
-                ]
-                for i in range(nr_timesegments)
-            ],
+            [[Timeslot(picks[14 * i + 2 * j], picks[14 * i + 2 * j + 1]) for j in range(7)] for i in range(nr_timesegments)],
             date=datetime.date.today(),
         )
 
@@ -1027,15 +1147,38 @@ class Parser:
 
     def open(self):
         """Tries to load the database file"""
+        self.lines = []
+        self.week_index = {}
         try:
             self.file = open(self.dbfile_path, mode="r+", encoding="utf-8")
+            self.lines = self.file.read().split("\n")
+            if self.lines[-1] == "":
+                self.lines.pop()  # the newline ending the last line does not start another one
         except FileNotFoundError as e:
             log.warning(
-                f'Could not find file with relative filepath "{self.dbfile_path}", original error: %s',
+                'Could not find file with relative filepath "%s"',
+                self.dbfile_path,
                 exc_info=e,
             )
+        else:
+            self.index_weeks()
         self.line = 0
 
+    def index_weeks(self):
+        """Scans the file once, indexing the line number of every week header"""
+        self.week_index = {}
+        i = 0
+        while i + 1 < len(self.lines):
+            try:
+                year, week = self.lines[i].split(self.delimiter)
+                nr_timesegments, nr_activities = map(int, self.lines[i + 1].split(self.delimiter))
+            except ValueError:
+                log.error("Could not index week header in file %s line %d", self.dbfile_path, i + 1)
+                return
+            self.week_index[(year, week)] = i + 1
+            # skip the header, the counts, the activities, the separator line and the timetable
+            i += 2 + nr_activities + 1 + nr_timesegments
+
     def close(self):
         """Closes the database file"""
         if self.file is not None:
@@ -1068,48 +1211,42 @@ class Parser:
         activities = dict()
         for _ in range(nr_activities):
             name, r, g, b = self.parse_next_line(4)
-            activities.update({name: Activity(name, r, g, b)})
+            activities.update({name: Activity(name, int(r), int(g), int(b))})
         self.parse_next_line()
         return activities
 
     def parse_timetable(self, nr_timesegments: int, activities: dict) -> list:
         """Helper function for parse_week : parses the timetable of a week"""
-        timetable = [[0] * 7 for _ in range(nr_timesegments)]
-        for i in range(nr_timesegments):
-            row = self.parse_next_line(14)
-            for j in range(7):
-                try:
-                    timetable[i][j] = Timeslot.from_strings(row[2 * j], row[2 * j + 1], activities)
-                except ParseError:
-                    log.error(
-                        f"Could not parse timeslot in file {self.dbfile_path} line {self.line} column {j} from '{row[2 * j]}' and '{row[2 * j + 1]}'"
-                    )
-                    timetable[i][j] = Timeslot(None, None)
+        rows = [self.parse_next_line(14) for _ in range(nr_timesegments)]
+        get = activities.get
+        timetable = [[Timeslot(get(row[2 * j]), None if row[2 * j + 1] == "-" else get(row[2 * j + 1])) for j in range(7)] for row in rows]
+        unknown = {name for row in rows for name in row if name != "-" and name not in activities}
+        if unknown:
+            log.error("Could not find activities with names %s referenced in timetable in file %s", sorted(unknown), self.dbfile_path)
         return timetable
 
     def parse_next_line(self, expected_el: int = 0) -> list:
         """Parses the next line from the file, returning a list of strings split by the delimiter."""
-        line = self.file.readline()
-        if line == "":
-            log.info(f"End of file reached in file {self.dbfile_path} line {self.line+1}")
+        if self.line >= len(self.lines):
+            log.info("End of file reached in file %s line %d", self.dbfile_path, self.line + 1)
             return None
+        elements = self.lines[self.line].split(self.delimiter)
         self.line += 1
-        elements = line.replace("\n", "").split(self.delimiter)
         if expected_el != 0 and len(elements) != expected_el:
-            log.error(f"Expected {expected_el} elements but parsed {len(elements)} elements in file {self.dbfile_path} line {self.line}.")
+            log.error("Expected %d elements but parsed %d elements in file %s line %d.", expected_el, len(elements), self.dbfile_path, self.line)
             raise ParseError
         return elements
 
-    def seek_for(self, *args):
-        """Seeks to a set of specific elements in a file"""
-        el = self.parse_next_line()
-        while el is not None and el != args:
-            el = self.parse_next_line()
-        log.error(f"Could not find seeking elements '{args}' in file {self.dbfile_path}")
+    def seek_for(self, year: str, week: str):
+        """Seeks to the line following the header of a week using the week index"""
+        try:
+            self.line = self.week_index[(year, week)]
+        except KeyError:
+            log.error("Could not find week header '%s' in file %s", (year, week), self.dbfile_path)
+            raise ParseError
 
     def reset_seek(self):
-        """Resets file seeker to the beginning of the file"""
-        self.file.seek(0, 0)
+        """Resets the line seeker to the beginning of the file"""
         self.line = 0
 
 
@@ -1122,11 +1259,11 @@ class CleanExit(Exception):
 
 
 def main(stdscr):
-    log.info(f"Terminal has color support: {curses.has_colors()}")
-    log.info(f"Terminal has extended color support: {curses.has_extended_color_support()}")
-    log.info(f"Terminal can change colors: {curses.can_change_color()}")
-    log.info(f"Amount of terminal colors: {curses.COLORS}")
-    log.info(f"Amount of terminal color pairs: {curses.COLOR_PAIRS}")
+    log.info("Terminal has color support: %s", curses.has_colors())
+    log.info("Terminal has extended color support: %s", curses.has_extended_color_support())
+    log.info("Terminal can change colors: %s", curses.can_change_color())
+    log.info("Amount of terminal colors: %d", curses.COLORS)
+    log.info("Amount of terminal color pairs: %d", curses.COLOR_PAIRS)
     curses.use_default_colors()
     curses.curs_set(0)
     stdscr.leaveok(False)